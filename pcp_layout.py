@@ -1,41 +1,183 @@
 # pcp_layout.py - Analyze PCP (Performance Co-Pilot) logs for system performance metrics
-# Usage: python3 pcp_layout.py [logfile] [start_time] [end_time]
+# Usage: python3 pcp_layout.py [--jobs N] [--nice K] [logfile] [start_time] [end_time]
 # Example: python3 pcp_layout.py 20260115.8.xz "2026-01-15 12:00" "2023-01-15 12:01"  [ Please use it for small iteration like a minute or two ]
 # Author: vishwanath.bombalekar@oracle.com
 
+import argparse
+import atexit
+import lzma
 import os
 import sys
 import subprocess
 import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 
 OUTPUT_DIR = "pcp_analysis"
 ERROR_LOG = os.path.join(OUTPUT_DIR, "errors.log")
 CONFIG_FILE = "/etc/pcp/pmrep/ora_pmrep.conf"
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-with open(ERROR_LOG, "w") as ef:
-    pass  # Clear error log on each run
+# Error-log handle; opened by setup() so that merely importing this
+# module creates no directories and wipes no files
+_ERR_FH = None
+
+# Serializes error-log appends when commands run in parallel
+_LOG_LOCK = threading.Lock()
+
+def setup():
+    # Create the output dir and error log only when actually running.
+    # One persistent line-buffered handle instead of an open/write/close
+    # per message; each error still hits the file immediately.
+    global _ERR_FH
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with open(ERROR_LOG, "w") as ef:
+        pass  # Clear error log on each run
+    _ERR_FH = open(ERROR_LOG, "a", buffering=1, encoding="utf-8")
+    atexit.register(_ERR_FH.close)
 
 def log_error(msg):
     print(msg)
-    with open(ERROR_LOG, "a") as ef:
-        ef.write(msg + "\n")
+    if _ERR_FH is None:
+        return
+    with _LOG_LOCK:
+        _ERR_FH.write(msg + "\n")
 
 def run_command(cmd, output_file):
+    # cmd is an argv list; no shell is involved, so no quoting is needed
     try:
-        with open(output_file, "w") as out, open(ERROR_LOG, "a") as err:
-            res = subprocess.run(cmd, shell=True, stdout=out, stderr=err)
+        # 1 MiB buffer: fewer write() syscalls for multi-MB sections
+        with open(output_file, "w", buffering=1024 * 1024) as out:
+            res = subprocess.run(cmd, stdout=out, stderr=_ERR_FH)
         if res.returncode != 0:
-            log_error(f"Error: Command '{cmd}' failed. See {ERROR_LOG} for details.")
+            log_error(f"Error: Command '{' '.join(cmd)}' failed. See {ERROR_LOG} for details.")
+            return False
+        return True
     except Exception as e:
-        log_error(f"Exception running '{cmd}': {e}")
+        log_error(f"Exception running '{' '.join(cmd)}': {e}")
+        return False
+
+def decompress_xz(src, dst):
+    # Prefer the multithreaded xz binary, fall back to the lzma module
+    xz = shutil.which("xz")
+    if xz:
+        with open(dst, "wb") as out:
+            res = subprocess.run([xz, "-dc", "-T0", src],
+                                 stdout=out, stderr=subprocess.DEVNULL)
+        if res.returncode == 0:
+            return True
+    try:
+        with lzma.open(src, "rb") as comp, \
+                open(dst, "wb", buffering=1024 * 1024) as out:
+            shutil.copyfileobj(comp, out, 256 * 1024)
+        return True
+    except (OSError, lzma.LZMAError) as e:
+        log_error(f"Failed to decompress {src}: {e}")
+        return False
+
+def prepare_archive(logname):
+    # libpcp decompresses an .xz archive into $TMPDIR on every open, so
+    # decompress once up front (tmpfs when available) and point all the
+    # commands at the plain copy. Companion archive files (base.meta,
+    # base.index, base.N) are decompressed or symlinked alongside so the
+    # PCP tools can still resolve the archive set.
+    if not logname.endswith(".xz"):
+        return logname
+    scratch = tempfile.mkdtemp(
+        prefix="pcp_layout.",
+        dir="/dev/shm" if os.path.isdir("/dev/shm") else None,
+    )
+    atexit.register(shutil.rmtree, scratch, True)
+    print(f"Decompressing {logname} once to {scratch} ...")
+    src_dir = os.path.dirname(os.path.abspath(logname))
+    base = re.sub(r"\.(meta|index|\d+)$", "",
+                  os.path.basename(logname)[:-len(".xz")])
+    for name in sorted(os.listdir(src_dir)):
+        if name != base and not name.startswith(base + "."):
+            continue
+        src = os.path.join(src_dir, name)
+        if not os.path.isfile(src):
+            continue
+        if name.endswith(".xz"):
+            if not decompress_xz(src, os.path.join(scratch, name[:-len(".xz")])):
+                log_error(f"Falling back to compressed archive: {logname}")
+                return logname
+        else:
+            os.symlink(src, os.path.join(scratch, name))
+    return os.path.join(scratch, os.path.basename(logname)[:-len(".xz")])
+
+def extract_window(worklog, stime, etime):
+    # Cut the archive down to the requested window once with pmlogextract
+    # so each report command scans a small extract instead of re-reading
+    # the whole archive. Commands keep their -S/-T flags, so the reported
+    # window is unchanged. Falls back to worklog if pmlogextract is
+    # missing or fails.
+    if shutil.which("pmlogextract") is None:
+        return worklog
+    scratch = tempfile.mkdtemp(
+        prefix="pcp_layout.extract.",
+        dir="/dev/shm" if os.path.isdir("/dev/shm") else None,
+    )
+    atexit.register(shutil.rmtree, scratch, True)
+    print("Extracting the requested window once with pmlogextract ...")
+    extract = os.path.join(scratch, "window")
+    try:
+        res = subprocess.run(
+            ["pmlogextract", "-z", "-S", f"@{stime}", "-T", f"@{etime}",
+             worklog, extract],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except Exception as e:
+        log_error(f"pmlogextract failed: {e}")
+        return worklog
+    if res.returncode != 0:
+        log_error(f"pmlogextract failed (rc={res.returncode})")
+        return worklog
+    return extract
+
+# Pre-compiled once: validate_time runs on every prompt/arg check
+_TIME_RE = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}$")
 
 def validate_time(timestr):
-    return re.match(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}$", timestr) is not None
+    # The regex is a cheap shape check; strptime then rejects impossible
+    # dates ("2026-13-45 25:99") locally instead of letting pmrep fail
+    # after a full archive open.
+    if _TIME_RE.match(timestr) is None:
+        return False
+    try:
+        datetime.strptime(timestr, "%Y-%m-%d %H:%M")
+        return True
+    except ValueError:
+        return False
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Analyze PCP (Performance Co-Pilot) logs for system performance metrics")
+    parser.add_argument("logname", nargs="?", help="PCP log file (optionally .xz-compressed)")
+    parser.add_argument("stime", nargs="?", help="start time, YYYY-MM-DD HH:MM")
+    parser.add_argument("etime", nargs="?", help="end time, YYYY-MM-DD HH:MM")
+    parser.add_argument("--jobs", type=int, metavar="N",
+                        default=min(4, os.cpu_count() or 1),
+                        help="max commands run concurrently (default: %(default)s)")
+    parser.add_argument("--nice", type=int, metavar="K", default=0,
+                        help="run commands under nice -n K (+ ionice idle-ish)")
+    return parser.parse_args()
+
+def deprioritize(cmd, niceness):
+    # Prefix cmd with nice/ionice so workers do not swamp a live host
+    if niceness <= 0:
+        return cmd
+    prefix = ["nice", "-n", str(niceness)]
+    if shutil.which("ionice"):
+        prefix += ["ionice", "-c2", "-n7"]
+    return prefix + cmd
 
 def main():
-    if len(sys.argv) == 4:
-        logname, stime, etime = sys.argv[1:4]
+    args = parse_args()
+    setup()
+    if args.logname and args.stime and args.etime:
+        logname, stime, etime = args.logname, args.stime, args.etime
     else:
         print("List of files in current directory:")
         print("\n".join(os.listdir('.')))
@@ -66,32 +208,42 @@ def main():
     print(f"Analyzing PCP log file: {logname}")
     print(f"Time range: {stime} to {etime}")
 
-    # Command definitions
+    # Pay the xz decompression cost once instead of once per command,
+    # then pay the full-archive scan once instead of once per command
+    worklog = prepare_archive(logname)
+    winlog = extract_window(worklog, stime, etime)
+
+    # Command definitions (argv lists, run without a shell)
     metrics = [
-        ("PMDUMPLOG", f"pmdumplog -z -L '{logname}'", f"PMDUMPLOG_{logname.replace(' ', '_')}.txt"),
-        ("Load", f"pmrep -z -a '{logname}' -p kernel.all.load -S '@{stime}' -T '@{etime}'", "Load.txt"),
-        ("Atop", f"pcp -z -a '{logname}' --start '@{stime}' --finish '@{etime}' atop", "Atop.txt"),
-        ("Mpstat", f"pcp -z -a '{logname}' --start '@{stime}' --finish '@{etime}' mpstat", "Mpstat.txt"),
-        ("Memory", f"pmrep -z -a '{logname}' -c '{CONFIG_FILE}' :meminfo-1 -p -S '@{stime}' -T '@{etime}'", "Memory.txt"),
-        ("Iostat", f"pcp -z -a '{logname}' --start '@{stime}' --finish '@{etime}' iostat -x t", "Iostat.txt"),
-        ("Vmstat", f"pmrep -z -a '{logname}' -p -S '@{stime}' -T '@{etime}' :vmstat", "Vmstat.txt"),
-        ("D_state_Blocked", f"pmrep -z -a '{logname}' -p proc.runq.runnable proc.runq.blocked -S '@{stime}' -T '@{etime}'", "D_state_Blocked.txt"),
-        ("Netstat", f"pcp -z -a '{logname}' --start '@{stime}' --finish '@{etime}' netstat", "Netstat.txt"),
-        ("PS", f"pcp -z -a '{logname}' --start '@{stime}' --finish '@{etime}' ps -u", "PS.txt"),
-        ("PID_STAT", f"pcp -z -a '{logname}' --start '@{stime}' --finish '@{etime}' pidstat -rl", "PID_STAT.txt"),
-        ("Slabinfo", f"pmrep -z -c '{CONFIG_FILE}' :slabinfo -a '{logname}' -p -S '@{stime}' -T '@{etime}'", "Slabinfo.txt"),
-        ("Numastat", f"pmrep -z -a '{logname}' -c '{CONFIG_FILE}' :numastat-1 -u -p -S '@{stime}' -T '@{etime}'", "Numastat.txt")
+        ("PMDUMPLOG", ["pmdumplog", "-z", "-L", worklog], f"PMDUMPLOG_{logname.replace(' ', '_')}.txt"),
+        ("Load", ["pmrep", "-z", "-a", winlog, "-p", "kernel.all.load", "-S", f"@{stime}", "-T", f"@{etime}"], "Load.txt"),
+        ("Atop", ["pcp", "-z", "-a", winlog, "--start", f"@{stime}", "--finish", f"@{etime}", "atop"], "Atop.txt"),
+        ("Mpstat", ["pcp", "-z", "-a", winlog, "--start", f"@{stime}", "--finish", f"@{etime}", "mpstat"], "Mpstat.txt"),
+        ("Memory", ["pmrep", "-z", "-a", winlog, "-c", CONFIG_FILE, ":meminfo-1", "-p", "-S", f"@{stime}", "-T", f"@{etime}"], "Memory.txt"),
+        ("Iostat", ["pcp", "-z", "-a", winlog, "--start", f"@{stime}", "--finish", f"@{etime}", "iostat", "-x", "t"], "Iostat.txt"),
+        ("Vmstat", ["pmrep", "-z", "-a", winlog, "-p", "-S", f"@{stime}", "-T", f"@{etime}", ":vmstat"], "Vmstat.txt"),
+        ("D_state_Blocked", ["pmrep", "-z", "-a", winlog, "-p", "proc.runq.runnable", "proc.runq.blocked", "-S", f"@{stime}", "-T", f"@{etime}"], "D_state_Blocked.txt"),
+        ("Netstat", ["pcp", "-z", "-a", winlog, "--start", f"@{stime}", "--finish", f"@{etime}", "netstat"], "Netstat.txt"),
+        ("PS", ["pcp", "-z", "-a", winlog, "--start", f"@{stime}", "--finish", f"@{etime}", "ps", "-u"], "PS.txt"),
+        ("PID_STAT", ["pcp", "-z", "-a", winlog, "--start", f"@{stime}", "--finish", f"@{etime}", "pidstat", "-rl"], "PID_STAT.txt"),
+        ("Slabinfo", ["pmrep", "-z", "-c", CONFIG_FILE, ":slabinfo", "-a", winlog, "-p", "-S", f"@{stime}", "-T", f"@{etime}"], "Slabinfo.txt"),
+        ("Numastat", ["pmrep", "-z", "-a", winlog, "-c", CONFIG_FILE, ":numastat-1", "-u", "-p", "-S", f"@{stime}", "-T", f"@{etime}"], "Numastat.txt")
     ]
 
-    for section, cmd, out_file in metrics:
-        out_path = os.path.join(OUTPUT_DIR, out_file)
-        print(f"--- {section} ---")
-        run_command(cmd, out_path)
-        print(f"Output for {section} saved to {out_path}")
+    # The commands are independent of each other, so run them in parallel.
+    # subprocess.run blocks in the child process, so threads are enough here.
+    with ThreadPoolExecutor(max_workers=min(len(metrics), max(1, args.jobs))) as ex:
+        futures = {
+            ex.submit(run_command, deprioritize(cmd, args.nice),
+                      os.path.join(OUTPUT_DIR, out_file)): section
+            for section, cmd, out_file in metrics
+        }
+        for fut in as_completed(futures):
+            section = futures[fut]
+            print(f"{section}: {'OK' if fut.result() else 'FAILED'}")
 
     print("\nAnalysis complete. Results saved to", OUTPUT_DIR)
     print("Check", ERROR_LOG, "for any errors encountered during execution.")
 
 if __name__ == "__main__":
-    import shutil
     main()
@@ -2,83 +2,371 @@
 """
 pcp_layout.py - Analyze PCP archive logs with time-range named output directory
 Usage:
-    python3 pcp_layout.py [archive] [start_time] [end_time]
+    python3 pcp_layout.py [--force] [--jobs N] [--nice K] [archive] [start_time] [end_time]
 Example:
     python3 pcp_layout.py 20260122.15.xz "2026-01-22 12:00" "2026-01-22 12:10"
 Author: Vishwanath Bombalekar
 """
+import argparse
+import atexit
+import hashlib
+import lzma
 import os
 import sys
 import subprocess
 import re
+import selectors
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 # Configuration file for some pmrep commands
 CONFIG_FILE = "/etc/pcp/pmrep/ora_pmrep.conf"
 
+LABEL_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pcp_layout", "labels")
 
-def log_error(msg, error_log_path):
+# Error-log handle: opened once per run in main() (line-buffered, so each
+# message appears immediately) and shared by every worker instead of
+# reopening the file for each message.
+_ERR_FH = None
+
+# Serializes error-log appends when report commands run in parallel
+_LOG_LOCK = threading.Lock()
+
+
+def log_error(msg):
     print(msg, file=sys.stderr)
+    if _ERR_FH is None:
+        return
     try:
-        with open(error_log_path, "a", encoding="utf-8") as f:
-            f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} {msg}\n")
+        with _LOG_LOCK:
+            _ERR_FH.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} {msg}\n")
     except:
         pass
 
 
-def run_command(cmd, output_file, error_log_path):
+def run_command(cmd, output_file):
+    # cmd is an argv list; no shell is involved, so no quoting is needed.
+    # The child writes raw bytes straight to the output fd, so the file
+    # is opened binary; stderr is sunk directly into the error-log fd,
+    # so no pipe can fill up and stall a worker and nothing needs
+    # draining in Python. Keeping the kwargs minimal also keeps
+    # subprocess on its posix_spawn fast path.
     try:
-        with open(output_file, "w", encoding="utf-8") as out:
+        # Flush buffered log text so it stays ordered w.r.t. the child's.
+        # The handle may still be unopened when called outside main().
+        with _LOG_LOCK:
+            if _ERR_FH is not None:
+                _ERR_FH.flush()
+        # 1 MiB buffer: fewer write() syscalls for multi-MB sections
+        with open(output_file, "wb", buffering=1024 * 1024) as out:
             result = subprocess.run(
                 cmd,
-                shell=True,
                 stdout=out,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
+                stderr=_ERR_FH,
                 timeout=300,
             )
         if result.returncode != 0:
-            log_error(f"Command failed (rc={result.returncode}): {cmd}", error_log_path)
-            if result.stderr:
-                log_error(f"stderr:\n{result.stderr.strip()}", error_log_path)
+            log_error(f"Command failed (rc={result.returncode}): {' '.join(cmd)}"
+                      " — stderr captured in the errors file")
             return False
         return True
     except subprocess.TimeoutExpired:
-        log_error(f"Command timed out after 300s: {cmd}", error_log_path)
+        log_error(f"Command timed out after 300s: {' '.join(cmd)}")
         return False
     except Exception as e:
-        log_error(f"Exception running: {cmd} → {type(e).__name__}: {e}", error_log_path)
+        log_error(f"Exception running: {' '.join(cmd)} → {type(e).__name__}: {e}")
         return False
 
 
+def _stream_output(cmd, timeout):
+    """
+    Run cmd, echoing its merged stdout/stderr as it arrives, and return
+    (returncode, output). The timeout is a wallclock deadline enforced
+    on the read loop itself with selectors: iterating proc.stdout would
+    block until EOF and only check the clock afterwards, so a hung child
+    would never time out. On expiry the child is killed and
+    subprocess.TimeoutExpired is raised.
+    """
+    deadline = time.monotonic() + timeout
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT)
+    chunks = []
+    try:
+        with selectors.DefaultSelector() as sel:
+            sel.register(proc.stdout, selectors.EVENT_READ)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not sel.select(remaining):
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+                data = os.read(proc.stdout.fileno(), 65536)
+                if not data:
+                    break
+                sys.stdout.write(data.decode("utf-8", "replace"))
+                sys.stdout.flush()
+                chunks.append(data)
+        proc.wait(timeout=max(1, deadline - time.monotonic()))
+    except Exception:
+        # Kill before any further wait so nothing blocks without a bound
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        proc.stdout.close()
+    return proc.returncode, b"".join(chunks).decode("utf-8", "replace")
+
+
+def _decompress_xz(src, dst):
+    """Decompress src → dst; prefer the multithreaded xz binary."""
+    xz = shutil.which("xz")
+    if xz:
+        with open(dst, "wb") as out:
+            res = subprocess.run([xz, "-dc", "-T0", src],
+                                 stdout=out, stderr=subprocess.DEVNULL)
+        if res.returncode == 0:
+            return True
+    try:
+        with lzma.open(src, "rb") as comp, \
+                open(dst, "wb", buffering=1024 * 1024) as out:
+            shutil.copyfileobj(comp, out, 256 * 1024)
+        return True
+    except (OSError, lzma.LZMAError) as e:
+        log_error(f"Failed to decompress {src}: {type(e).__name__}: {e}")
+        return False
+
+
+def prepare_archive(archive):
+    """
+    If the archive is xz-compressed, decompress it once into a scratch
+    directory (tmpfs when available) and return the plain path that all
+    report commands should use instead.
+
+    libpcp fully decompresses an .xz archive into $TMPDIR on every open,
+    so pointing all 13 commands at an already-plain copy pays the xz
+    decode once instead of once per command. Companion archive files
+    (base.meta / base.index / base.N) are decompressed or symlinked
+    alongside so libpcp can still resolve the archive set.
+    """
+    if not archive.endswith(".xz"):
+        return archive
+
+    scratch = tempfile.mkdtemp(
+        prefix="pcp_layout.",
+        dir="/dev/shm" if os.path.isdir("/dev/shm") else None,
+    )
+    atexit.register(shutil.rmtree, scratch, True)
+
+    print(f"Decompressing {archive} once to {scratch} ...")
+    src_dir = os.path.dirname(os.path.abspath(archive))
+    base = re.sub(r"\.(meta|index|\d+)$", "",
+                  os.path.basename(archive)[:-len(".xz")])
+    for name in sorted(os.listdir(src_dir)):
+        if name != base and not name.startswith(base + "."):
+            continue
+        src = os.path.join(src_dir, name)
+        if not os.path.isfile(src):
+            continue
+        if name.endswith(".xz"):
+            if not _decompress_xz(src, os.path.join(scratch, name[:-len(".xz")])):
+                log_error(f"Falling back to compressed archive: {archive}")
+                return archive
+        else:
+            os.symlink(src, os.path.join(scratch, name))
+    return os.path.join(scratch, os.path.basename(archive)[:-len(".xz")])
+
+
+def extract_window(work_archive, start_time, end_time):
+    """
+    Cut the archive down to the requested time window once with
+    pmlogextract, so each report command scans a small single-window
+    extract instead of re-reading the whole archive. Every command keeps
+    its own -S/-T flags, so the reported window is unchanged. Falls back
+    to the input archive if pmlogextract is missing or fails.
+    """
+    if shutil.which("pmlogextract") is None:
+        return work_archive
+
+    scratch = tempfile.mkdtemp(
+        prefix="pcp_layout.extract.",
+        dir="/dev/shm" if os.path.isdir("/dev/shm") else None,
+    )
+    atexit.register(shutil.rmtree, scratch, True)
+
+    print("Extracting the requested window once with pmlogextract ...")
+    extract = os.path.join(scratch, "window")
+    try:
+        res = subprocess.run(
+            ["pmlogextract", "-z",
+             "-S", f"@{start_time}", "-T", f"@{end_time}",
+             work_archive, extract],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            timeout=300,
+        )
+    except Exception as e:
+        log_error(f"pmlogextract failed: {type(e).__name__}: {e}")
+        return work_archive
+    if res.returncode != 0:
+        log_error(f"pmlogextract failed (rc={res.returncode}): {res.stderr.strip()[:500]}")
+        return work_archive
+    return extract
+
+
+def label_cache_path(archive):
+    """
+    Cache location for this archive's `pmdumplog -z -L` output. The key
+    covers path, size and mtime, so any change to the archive misses.
+    """
+    st = os.stat(archive)
+    key = hashlib.sha1(
+        f"{os.path.abspath(archive)}:{st.st_size}:{st.st_mtime_ns}".encode()
+    ).hexdigest()
+    return os.path.join(LABEL_CACHE_DIR, key)
+
+
+def cached_label(archive):
+    """Return the cached `pmdumplog -z -L` output for archive, or None."""
+    try:
+        path = label_cache_path(archive)
+        if os.path.isfile(path) and os.path.getsize(path) > 0:
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+    except OSError:
+        pass
+    return None
+
+
+def cache_label(archive, text):
+    """Store `pmdumplog -z -L` output for archive in the label cache."""
+    try:
+        os.makedirs(LABEL_CACHE_DIR, exist_ok=True)
+        with open(label_cache_path(archive), "w", encoding="utf-8") as f:
+            f.write(text)
+    except OSError as e:
+        log_error(f"Could not cache archive label: {e}")
+
+
+def save_label_report(archive, work_archive, output_file):
+    """
+    Write the archive label section. A label-cache hit is a pure file
+    copy; a miss runs pmdumplog once (against the already-decompressed
+    copy) and populates the cache for the next run.
+    """
+    text = cached_label(archive)
+    if text is None:
+        try:
+            result = subprocess.run(
+                ["pmdumplog", "-z", "-L", work_archive],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+                timeout=60,
+            )
+        except Exception as e:
+            log_error(f"Exception running pmdumplog -L: {type(e).__name__}: {e}")
+            return False
+        if result.returncode != 0:
+            log_error(f"pmdumplog -L failed (rc={result.returncode})")
+            return False
+        text = result.stdout
+        cache_label(archive, text)
+    try:
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write(text)
+    except OSError as e:
+        log_error(f"Could not write {output_file}: {e}")
+        return False
+    return True
+
+
+# Pre-compiled once: validate_time runs on every prompt/arg check
+_TIME_RE = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}(:\d{2})?$")
+
+
+# Formats accepted for the analysis time window
+_TIME_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S")
+
+
 def validate_time(timestr):
-    return bool(re.match(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}(:\d{2})?$", timestr))
+    # The regex is a cheap shape check; strptime then rejects impossible
+    # dates ("2026-13-45 25:99") locally instead of letting pmrep fail
+    # after a full archive open.
+    if _TIME_RE.match(timestr) is None:
+        return False
+    for fmt in _TIME_FORMATS:
+        try:
+            datetime.strptime(timestr, fmt)
+            return True
+        except ValueError:
+            continue
+    return False
 
 
 def time_to_dir_format(timestr):
     """
     Convert '2026-01-26 12:05' → '260120261205'
     Format: DDMMYYYYHHMM
+
+    Parses via the accepted _TIME_FORMATS so the 'HH:MM:SS' form yields
+    the same directory name as 'HH:MM' (the old regex+slicing version
+    mistook the seconds for part of the minute).
     """
     if not timestr:
         return "unknown"
-    cleaned = re.sub(r"[- :]", "", timestr)
-    year = cleaned[0:4]
-    month = cleaned[4:6]
-    day = cleaned[6:8]
-    hour = cleaned[8:10]
-    minute = cleaned[10:12]
-    return f"{day}{month}{year}{hour}{minute}"
+    for fmt in _TIME_FORMATS:
+        try:
+            return datetime.strptime(timestr, fmt).strftime("%d%m%Y%H%M")
+        except ValueError:
+            continue
+    return "unknown"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Analyze PCP archive logs with time-range named output directory")
+    parser.add_argument("archive", nargs="?",
+                        help="PCP archive (optionally .xz-compressed)")
+    parser.add_argument("start_time", nargs="?",
+                        help="window start, YYYY-MM-DD HH:MM[:SS]")
+    parser.add_argument("end_time", nargs="?",
+                        help="window end, YYYY-MM-DD HH:MM[:SS]")
+    parser.add_argument("--force", action="store_true",
+                        help="re-run sections even when their output is up to date")
+    parser.add_argument("--jobs", type=int, metavar="N",
+                        default=min(4, os.cpu_count() or 1),
+                        help="max report commands run concurrently (default: %(default)s)")
+    parser.add_argument("--nice", type=int, metavar="K", default=0,
+                        help="run report commands under nice -n K (+ ionice idle-ish)")
+    return parser.parse_args()
+
+
+def deprioritize(cmd, niceness):
+    """Prefix cmd with nice/ionice so workers do not swamp a live host."""
+    if niceness <= 0:
+        return cmd
+    prefix = ["nice", "-n", str(niceness)]
+    if shutil.which("ionice"):
+        prefix += ["ionice", "-c2", "-n7"]
+    return prefix + cmd
 
 
 def main():
-    if len(sys.argv) == 4:
-        archive, start_time, end_time = sys.argv[1:4]
+    args = parse_args()
+    force = args.force
+
+    if args.archive and args.start_time and args.end_time:
+        archive, start_time, end_time = args.archive, args.start_time, args.end_time
     else:
         print("\nFiles in current directory:")
         print("─" * 50)
-        for fname in sorted(os.listdir(".")):
-            if os.path.isfile(fname):
+        # scandir caches the file type from the directory read,
+        # avoiding a stat() per entry
+        with os.scandir(".") as it:
+            for fname in sorted(e.name for e in it if e.is_file()):
                 print(f"  {fname}")
         print("─" * 50)
 
@@ -86,16 +374,27 @@ def main():
 
         print(f"\nReading archive metadata for: {archive}")
         print("─" * 60)
-        cmd = f"pmdumplog -z -L '{archive}' 2>&1"
-        try:
-            proc = subprocess.Popen(
-                cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                universal_newlines=True
-            )
-            stdout, _ = proc.communicate(timeout=60)
-            print(stdout.strip() or "(no output)")
-        except Exception as e:
-            print(f"Could not read archive label: {e}")
+        # Serve the label from the cache when the archive is unchanged;
+        # this skips a full decompression of an .xz archive.
+        label = cached_label(archive) if os.path.isfile(archive) else None
+        if label is not None:
+            print(label.strip() or "(no output)")
+        else:
+            cmd = ["pmdumplog", "-z", "-L", archive]
+            try:
+                # Stream the label instead of buffering it with
+                # communicate(): the first line appears immediately
+                # rather than after the whole archive decode, and the
+                # 60s limit covers the read loop itself.
+                rc, stdout = _stream_output(cmd, timeout=60)
+                if not stdout:
+                    print("(no output)")
+                elif rc == 0:
+                    cache_label(archive, stdout)
+            except subprocess.TimeoutExpired:
+                print("Timeout while reading archive label")
+            except Exception as e:
+                print(f"Could not read archive label: {e}")
         print("─" * 60 + "\n")
 
         start_time = input("Start time (YYYY-MM-DD HH:MM): ").strip()
@@ -124,36 +423,68 @@ def main():
         f.write(f"Archive : {archive}\n")
         f.write(f"Period  : {start_time} → {end_time}\n\n")
 
+    # One persistent line-buffered handle for all error messages from
+    # here on; log_error and run_command both write through it.
+    global _ERR_FH
+    _ERR_FH = open(ERROR_LOG, "a", buffering=1, encoding="utf-8")
+    atexit.register(_ERR_FH.close)
+
     print(f"\nOutput directory : {OUTPUT_DIR}/")
     print(f"Archive          : {archive}")
     print(f"Time window      : {start_time} → {end_time}\n")
 
-    # Reports with clean, prefixed filenames (no .log extension)
+    # Pay the xz decompression cost once instead of once per command,
+    # then pay the full-archive scan once instead of once per command
+    work_archive = prepare_archive(archive)
+    win_archive = extract_window(work_archive, start_time, end_time)
+
+    # Reports with clean, prefixed filenames (no .log extension).
+    # Commands are argv lists, run without a shell.
     reports = [
-        ("archive-label",    f"pmdumplog -z -L '{archive}'",                    "pcp-archive-label"),
-        ("load",             f"pmrep -z -a '{archive}' -p kernel.all.load -S '@{start_time}' -T '@{end_time}'", "pcp-load"),
-        ("atop",             f"pcp -z -a '{archive}' --start '@{start_time}' --finish '@{end_time}' atop",      "pcp-atop"),
-        ("mpstat",           f"pcp -z -a '{archive}' --start '@{start_time}' --finish '@{end_time}' mpstat",    "pcp-mpstat"),
-        ("memory",           f"pmrep -z -a '{archive}' -c '{CONFIG_FILE}' :meminfo-1 -p -S '@{start_time}' -T '@{end_time}'", "pcp-memory"),
-        ("iostat",           f"pcp -z -a '{archive}' --start '@{start_time}' --finish '@{end_time}' iostat -x 1", "pcp-iostat"),
-        ("vmstat",           f"pmrep -z -a '{archive}' -p -S '@{start_time}' -T '@{end_time}' :vmstat",         "pcp-vmstat"),
-        ("runq-blocked",     f"pmrep -z -a '{archive}' -p proc.runq.runnable proc.runq.blocked -S '@{start_time}' -T '@{end_time}'", "pcp-runq-blocked"),
-        ("netstat",          f"pcp -z -a '{archive}' --start '@{start_time}' --finish '@{end_time}' netstat",   "pcp-netstat"),
-        ("ps",               f"pcp -z -a '{archive}' --start '@{start_time}' --finish '@{end_time}' ps -u",     "pcp-ps"),
-        ("pidstat",          f"pcp -z -a '{archive}' --start '@{start_time}' --finish '@{end_time}' pidstat -rl 1", "pcp-pidstat"),
-        ("slabinfo",         f"pmrep -z -a '{archive}' -c '{CONFIG_FILE}' :slabinfo -p -S '@{start_time}' -T '@{end_time}'", "pcp-slabinfo"),
-        ("numastat",         f"pmrep -z -a '{archive}' -c '{CONFIG_FILE}' :numastat-1 -u -p -S '@{start_time}' -T '@{end_time}'", "pcp-numastat"),
+        # cmd=None → served from the label cache by save_label_report
+        ("archive-label",    None,                                              "pcp-archive-label"),
+        ("load",             ["pmrep", "-z", "-a", win_archive, "-p", "kernel.all.load", "-S", f"@{start_time}", "-T", f"@{end_time}"], "pcp-load"),
+        ("atop",             ["pcp", "-z", "-a", win_archive, "--start", f"@{start_time}", "--finish", f"@{end_time}", "atop"], "pcp-atop"),
+        ("mpstat",           ["pcp", "-z", "-a", win_archive, "--start", f"@{start_time}", "--finish", f"@{end_time}", "mpstat"], "pcp-mpstat"),
+        ("memory",           ["pmrep", "-z", "-a", win_archive, "-c", CONFIG_FILE, ":meminfo-1", "-p", "-S", f"@{start_time}", "-T", f"@{end_time}"], "pcp-memory"),
+        ("iostat",           ["pcp", "-z", "-a", win_archive, "--start", f"@{start_time}", "--finish", f"@{end_time}", "iostat", "-x", "1"], "pcp-iostat"),
+        ("vmstat",           ["pmrep", "-z", "-a", win_archive, "-p", "-S", f"@{start_time}", "-T", f"@{end_time}", ":vmstat"], "pcp-vmstat"),
+        ("runq-blocked",     ["pmrep", "-z", "-a", win_archive, "-p", "proc.runq.runnable", "proc.runq.blocked", "-S", f"@{start_time}", "-T", f"@{end_time}"], "pcp-runq-blocked"),
+        ("netstat",          ["pcp", "-z", "-a", win_archive, "--start", f"@{start_time}", "--finish", f"@{end_time}", "netstat"], "pcp-netstat"),
+        ("ps",               ["pcp", "-z", "-a", win_archive, "--start", f"@{start_time}", "--finish", f"@{end_time}", "ps", "-u"], "pcp-ps"),
+        ("pidstat",          ["pcp", "-z", "-a", win_archive, "--start", f"@{start_time}", "--finish", f"@{end_time}", "pidstat", "-rl", "1"], "pcp-pidstat"),
+        ("slabinfo",         ["pmrep", "-z", "-a", win_archive, "-c", CONFIG_FILE, ":slabinfo", "-p", "-S", f"@{start_time}", "-T", f"@{end_time}"], "pcp-slabinfo"),
+        ("numastat",         ["pmrep", "-z", "-a", win_archive, "-c", CONFIG_FILE, ":numastat-1", "-u", "-p", "-S", f"@{start_time}", "-T", f"@{end_time}"], "pcp-numastat"),
     ]
 
+    # The report commands are independent, so run them in parallel.
+    # subprocess.run blocks in the child, so a thread pool is sufficient.
     success = 0
-    for title, cmd, filename in reports:
-        out_path = os.path.join(OUTPUT_DIR, filename)
-        print(f"→ {title:.<20} ", end="", flush=True)
-        if run_command(cmd, out_path, ERROR_LOG):
-            print("OK")
-            success += 1
-        else:
-            print("FAILED")
+    with ThreadPoolExecutor(max_workers=min(len(reports), max(1, args.jobs))) as ex:
+        futures = {}
+        for title, cmd, filename in reports:
+            out_path = os.path.join(OUTPUT_DIR, filename)
+            # The output dir is deterministic for a given archive+window,
+            # so an up-to-date output file means identical work: skip it.
+            if (not force and cmd is not None
+                    and os.path.exists(out_path)
+                    and os.path.getsize(out_path) > 0
+                    and os.path.getmtime(out_path) >= os.path.getmtime(archive)):
+                print(f"→ {title:.<20} CACHED")
+                success += 1
+                continue
+            if cmd is None:
+                fut = ex.submit(save_label_report, archive, work_archive, out_path)
+            else:
+                fut = ex.submit(run_command, deprioritize(cmd, args.nice), out_path)
+            futures[fut] = title
+        for fut in as_completed(futures):
+            title = futures[fut]
+            if fut.result():
+                print(f"→ {title:.<20} OK")
+                success += 1
+            else:
+                print(f"→ {title:.<20} FAILED")
 
     print(f"\nDone. {success}/{len(reports)} sections completed.")
     print(f"Results in: ./{OUTPUT_DIR}/")